@@ -1,12 +1,12 @@
-import joblib
+import xgboost as xgb
 import logging
 import signal
 import sys
 from src.bot import run_trading_bot
 
 # --- Config: Set your model paths here ---
-CLASSIFIER_PATH = "models/best_xgb_classifier.pkl"
-REGRESSOR_PATH = "models/best_xgb_regressor.pkl"
+CLASSIFIER_PATH = "models/best_xgb_classifier.ubj"
+REGRESSOR_PATH = "models/best_xgb_regressor.ubj"
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, filename="bot.log", filemode="a",
@@ -14,8 +14,9 @@ logging.basicConfig(level=logging.INFO, filename="bot.log", filemode="a",
 
 def load_models():
     logging.info("Loading models...")
-    clf = joblib.load(CLASSIFIER_PATH)
-    reg = joblib.load(REGRESSOR_PATH)
+    # Native XGBoost model files load straight into the boosters the bot predicts with
+    clf = xgb.Booster(model_file=CLASSIFIER_PATH)
+    reg = xgb.Booster(model_file=REGRESSOR_PATH)
     logging.info("Models loaded successfully")
     return clf, reg
 
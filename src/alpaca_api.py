@@ -1,13 +1,16 @@
+import asyncio
 import alpaca_trade_api as tradeapi
 import pandas as pd
 import yfinance as yf
 from src.keys.paper_config import API_KEY, SECRET_KEY, BASE_URL
 from datetime import datetime, timedelta
+import threading
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.timeframe import TimeFrame
 from alpaca.data.enums import DataFeed
 from src.trading_strategy import build_features
+from src.rate_limit import RateLimiter
 
 """
 Alpaca Trading Utility & Data Client
@@ -25,6 +28,7 @@ Main Features:
     - Custom feature engineering via `build_features(df)`
 - Supports placing and closing orders (market by default).
 - Includes fallback to yfinance when Alpaca data access is restricted (e.g., sandbox mode or rate limits).
+- All Alpaca REST calls share one sliding-window limiter (at most 200 requests in any minute), so concurrent callers stay within the API budget.
 
 Key Methods:
 ------------
@@ -37,6 +41,7 @@ Key Methods:
 - `close_all_positions()` – Closes all open positions
 - `is_market_open()` – Checks whether the US market is open
 - `get_watchlist_symbols()` – Returns a predefined list of tech/growth stocks used as a universe
+- `get_market_snapshot_async()` – Fetches prices and open positions concurrently for one trading cycle
 
 Requirements:
 -------------
@@ -52,6 +57,61 @@ This module is intended to be imported and used by strategy scripts or trading l
 
 api = tradeapi.REST(API_KEY, SECRET_KEY, BASE_URL, api_version='v2')
 
+# Upper bound on concurrent yfinance downloads
+MAX_DOWNLOAD_THREADS = 8
+
+# Alpaca allows 200 REST requests per minute per account
+alpaca_rate_limiter = RateLimiter(max_calls=200, period=60)
+
+
+# Last frame downloaded per (tickers, interval, period), kept for the life of the process. Later
+# calls re-fetch only a short recent window and splice it on, instead of the whole period.
+_download_cache = {}
+_download_cache_lock = threading.Lock()
+
+# Recent window re-fetched to refresh a cached frame, per bar interval
+REFRESH_PERIOD = {'1m': '1d', '1d': '5d'}
+
+
+def _download(tickers, interval, period):
+    # A ticker tuple is fetched in one batched call spread over a bounded thread pool
+    threads = True
+    if isinstance(tickers, tuple):
+        tickers = list(tickers)
+        threads = min(MAX_DOWNLOAD_THREADS, len(tickers))
+    return yf.download(tickers=tickers, interval=interval, period=period, progress=False,
+                       auto_adjust=True, threads=threads)
+
+
+def download_cached(tickers, interval='1m', period='5d'):
+    if not isinstance(tickers, str):
+        tickers = tuple(tickers)
+    key = (tickers, interval, period)
+
+    with _download_cache_lock:
+        cached = _download_cache.get(key)
+
+    df = None
+    if cached is not None and not cached.empty and interval in REFRESH_PERIOD:
+        recent = _download(tickers, interval, REFRESH_PERIOD[interval])
+        # The recent bars replace the cached ones from their first bar on (the last cached bar may
+        # still have been forming). This is only done while they overlap the cache and stay on its
+        # last date: a new date moves the start of a full download, and the cumulative features
+        # (VWAP, OBV) depend on that start, so the whole period is downloaded again then.
+        if (not recent.empty and recent.index[0] <= cached.index[-1]
+                and recent.index[-1].date() == cached.index[-1].date()):
+            df = pd.concat([cached[cached.index < recent.index[0]], recent])
+
+    if df is None:
+        df = _download(tickers, interval, period)
+
+    with _download_cache_lock:
+        _download_cache[key] = df
+
+    # Callers reassign the index/columns of the frame they get, so hand out a shallow copy
+    return df.copy(deep=False)
+
+
 data_client = StockHistoricalDataClient(
     api_key=API_KEY,
     secret_key=SECRET_KEY,
@@ -65,10 +125,12 @@ class User_Actions:
                  base_url=BASE_URL):
         # Trading (paper) client
         self.api = tradeapi.REST(api_key, secret_key, base_url, api_version='v2')
+        alpaca_rate_limiter.acquire()
         self.account = self.api.get_account()
 
     def create_watchlist(self, name, symbols):
         try:
+            alpaca_rate_limiter.acquire()
             watchlist = self.api.create_watchlist(name=name, symbols=symbols)
             print(f"Watchlist '{name}' created with id: {watchlist.id}")
             return watchlist
@@ -94,6 +156,7 @@ class User_Actions:
 
     def get_positions(self):
         try:
+            alpaca_rate_limiter.acquire()
             positions = self.api.list_positions()
             return [p.symbol for p in positions]
         except Exception as e:
@@ -105,25 +168,43 @@ class User_Actions:
         if isinstance(symbols, str):
             symbols = [symbols]
 
+        try:
+            df = download_cached(symbols, interval='1m', period='5d')
+            close = df['Close'] if not df.empty else None
+        except Exception as e:
+            print(f"Error fetching prices for {symbols} from yfinance: {e}")
+            close = None
+
         for symbol in symbols:
-            try:
-                df = yf.download(tickers=symbol, interval='1m', period='5d', progress=False, auto_adjust=True)
-                if df.empty:
-                    print(f"No price data found for {symbol} on yfinance.")
-                    prices[symbol] = None
-                else:
-                    # Use last close price available
-                    prices[symbol] = df['Close'].iloc[-1]
-            except Exception as e:
-                print(f"Error fetching price for {symbol} from yfinance: {e}")
+            if close is None or symbol not in close.columns:
+                print(f"No price data found for {symbol} on yfinance.")
+                prices[symbol] = None
+                continue
+            # Bars are aligned across tickers, so drop rows this symbol did not trade
+            symbol_close = close[symbol].dropna()
+            if symbol_close.empty:
+                print(f"No price data found for {symbol} on yfinance.")
                 prices[symbol] = None
+            else:
+                # Use last close price available, as a plain float
+                prices[symbol] = float(symbol_close.iloc[-1])
 
         return prices
 
 
+    async def get_market_snapshot_async(self, symbols):
+        # Independent per-cycle reads run concurrently on worker threads;
+        # the Alpaca side still goes through the shared rate limiter
+        loop = asyncio.get_running_loop()
+        prices, positions = await asyncio.gather(
+            loop.run_in_executor(None, self.get_prices, symbols),
+            loop.run_in_executor(None, self.get_positions),
+        )
+        return prices, positions
+
     def get_intraday_yfinance(self, symbol, interval='1m', period='5d'):
         try:
-            df = yf.download(tickers=symbol, interval=interval, period=period, progress=False, auto_adjust=True)
+            df = download_cached(symbol, interval=interval, period=period)
             if df.empty:
                 print(f"No intraday data found for {symbol} (yfinance fallback)")
                 return None
@@ -161,6 +242,7 @@ class User_Actions:
 
     def submit_order(self, symbol, qty, side, order_type='market', time_in_force='gtc'):
         try:
+            alpaca_rate_limiter.acquire()
             return self.api.submit_order(
                 symbol=symbol,
                 qty=qty,
@@ -174,18 +256,22 @@ class User_Actions:
 
     def close_position(self, symbol):
         try:
+            alpaca_rate_limiter.acquire()
             self.api.close_position(symbol)
         except Exception as e:
             print(f"Error closing position for {symbol}: {e}")
 
     def close_all_positions(self):
         try:
+            alpaca_rate_limiter.acquire()
             for pos in self.api.list_positions():
+                alpaca_rate_limiter.acquire()
                 self.api.close_position(pos.symbol)
         except Exception as e:
             print(f"Error closing all positions: {e}")
 
     def is_market_open(self):
+        alpaca_rate_limiter.acquire()
         clock = self.api.get_clock()
         return clock.is_open
 
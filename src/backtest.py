@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-import joblib
+import xgboost as xgb
+from numba import njit, prange
 
 """
 Backtesting Script for ML-Based Trading Strategy
@@ -33,7 +34,7 @@ Outputs:
 
 Dependencies:
 -------------
-- Requires pre-trained models: `best_xgb_classifier.pkl`, `best_xgb_regressor.pkl`
+- Requires pre-trained models: `best_xgb_classifier.ubj`, `best_xgb_regressor.ubj` (native XGBoost format)
 - Input data: preprocessed historical data in `data/unseen_dataprocessed/training_data.parquet`
 - Uses `build_features()` logic already integrated into the input data
 
@@ -42,11 +43,14 @@ Purpose:
 Evaluate model performance on unseen historical data to inform real-time deployment readiness.
 """
 
-df = pd.read_parquet("data/unseen_dataprocessed/training_data.parquet")
-
 # Load models
-clf_model = joblib.load("models/best_xgb_classifier.pkl")
-reg_model = joblib.load("models/best_xgb_regressor.pkl")
+clf_booster = xgb.Booster(model_file="models/best_xgb_classifier.ubj")
+reg_booster = xgb.Booster(model_file="models/best_xgb_regressor.ubj")
+
+# Read only the model inputs (and close for pricing); labels, symbol etc. stay on disk
+features = clf_booster.feature_names
+df = pd.read_parquet("data/unseen_dataprocessed/training_data.parquet",
+                     columns=list(dict.fromkeys(features + ['close'])))
 
 # Parameters
 clf_threshold = 0.58
@@ -56,126 +60,164 @@ TAKE_PROFIT_PCT = 0.1
 INITIAL_CAPITAL = 100 
 POSITION_SIZE_PCT = 0.2  
 
-features = [col for col in df.columns if col not in ['target', 'target_return', 'future_close', 'symbol', 'index']]
-X = df[features]
-prices = df['close'].values
-
-clf_probs = clf_model.predict_proba(X)[:, 1]
-reg_preds = reg_model.predict(X)
-
-capital = INITIAL_CAPITAL
-positions = []
-trades = []
-
-for i in range(len(df)):
-    price = prices[i]
-    prob = clf_probs[i]
-    pred_return = reg_preds[i]
-
-    still_open_positions = []
-    for position in positions:
-        entry_price = position["entry_price"]
-        direction = position["direction"]
-        entry_capital = position["capital_allocated"]
-
-        # Calculate return 
-        if direction == "long":
-            change = (price - entry_price) / entry_price
-        else:  # short
-            change = (entry_price - price) / entry_price
-
-        exit_trade = False
-        reason = None
-
-        if direction == "long":
-            if change <= -STOP_LOSS_PCT:
-                reason = "stop_loss"
-                exit_trade = True
-            elif change >= TAKE_PROFIT_PCT:
-                reason = "take_profit"
-                exit_trade = True
-        else:
-            if change >= STOP_LOSS_PCT:
-                reason = "stop_loss"
-                exit_trade = True
-            elif change <= -TAKE_PROFIT_PCT:
-                reason = "take_profit"
-                exit_trade = True
-
-        # Signal reverse exit)
-        if not exit_trade:
-            if direction == "long" and (prob < (1 - clf_threshold) and pred_return < -reg_threshold):
-                reason = "signal_reverse"
-                exit_trade = True
-            elif direction == "short" and (prob > clf_threshold and pred_return > reg_threshold):
-                reason = "signal_reverse"
-                exit_trade = True
-
-        if exit_trade:
-            # Calculate profit/loss on capital
-            profit_loss = entry_capital * change
-            capital += entry_capital + profit_loss  # Return capital + P/L
-            trades.append({
-                "entry_index": position["entry_index"],
-                "exit_index": i,
-                "entry_price": entry_price,
-                "exit_price": price,
-                "direction": direction,
-                "return": change,
-                "capital_allocated": entry_capital,
-                "profit_loss": profit_loss,
-                "reason": reason
-            })
-        else:
-            still_open_positions.append(position)
-
-    positions = still_open_positions
-
-    if prob > clf_threshold and pred_return > reg_threshold:
-        capital_to_use = capital * POSITION_SIZE_PCT
-        if capital_to_use > 0:  # can buy at least one unit
-            capital -= capital_to_use
-            positions.append({
-                "entry_index": i,
-                "entry_price": price,
-                "direction": "long",
-                "capital_allocated": capital_to_use
-            })
-
-    elif prob < 0.25 and pred_return < -0.0065:
-        capital_to_use = capital * POSITION_SIZE_PCT
-        if capital_to_use > 0:
-            capital -= capital_to_use
-            positions.append({
-                "entry_index": i,
-                "entry_price": price,
-                "direction": "short",
-                "capital_allocated": capital_to_use
-            })
-
-# Close any remaining positions at last price
-final_price = prices[-1]
-for position in positions:
-    direction = position["direction"]
-    entry_price = position["entry_price"]
-    entry_capital = position["capital_allocated"]
-    ret = (final_price - entry_price) / entry_price if direction == "long" else (entry_price - final_price) / entry_price
-    profit_loss = entry_capital * ret
-    capital += entry_capital + profit_loss
-    trades.append({
-        "entry_index": position["entry_index"],
-        "exit_index": len(df) - 1,
-        "entry_price": entry_price,
-        "exit_price": final_price,
-        "direction": direction,
-        "return": ret,
-        "capital_allocated": entry_capital,
-        "profit_loss": profit_loss,
-        "reason": "end_of_data"
-    })
-
-# Convert trades to DataFrame
-trades_df = pd.DataFrame(trades)
+# Batch inference straight on the boosters: one contiguous array, no per-call DMatrix.
+# Columns are taken in the booster's own feature order since a raw array carries no names.
+# float32 is what the trees compare against internally, so this halves the bytes moved for free
+X = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+prices = df['close'].to_numpy(dtype=np.float64)  # P/L arithmetic stays in float64
+
+clf_probs = clf_booster.inplace_predict(X)  # binary:logistic -> P(up)
+reg_preds = reg_booster.inplace_predict(X)
+
+n = len(prices)
+bar_index = np.arange(n)
+
+# Entry signals for every bar at once
+long_entry = (clf_probs > clf_threshold) & (reg_preds > reg_threshold)
+short_entry = (clf_probs < 0.25) & (reg_preds < -0.0065)
+
+# Signal reverse: longs exit on a bearish signal, shorts on a fresh long signal
+long_reverse = (clf_probs < (1 - clf_threshold)) & (reg_preds < -reg_threshold)
+short_reverse = long_entry
+
+
+def next_true_index(mask):
+    """For each bar, index of the first bar at or after it where `mask` is set (len(mask) if none)."""
+    idx = np.where(mask, bar_index, n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+next_long_reverse = np.append(next_true_index(long_reverse), n)
+next_short_reverse = np.append(next_true_index(short_reverse), n)
+
+# Exit reasons are carried as int8 codes through the compiled kernels
+EXIT_REASONS = np.array(["stop_loss", "take_profit", "signal_reverse", "end_of_data"], dtype=object)
+STOP_LOSS, TAKE_PROFIT, SIGNAL_REVERSE, END_OF_DATA = 0, 1, 2, 3
+
+
+@njit(parallel=True, cache=True)
+def find_exits(prices, entry_index, entry_direction, next_long_reverse, next_short_reverse,
+               stop_loss_pct, take_profit_pct):
+    """First bar after each entry that hits stop loss / take profit, else the next signal reverse bar."""
+    n = len(prices)
+    m = len(entry_index)
+    exit_index = np.empty(m, dtype=np.int64)
+    exit_return = np.empty(m, dtype=np.float64)
+    exit_reason = np.empty(m, dtype=np.int8)
+
+    # Entries are independent (capital is applied afterwards), so scan them in parallel
+    for k in prange(m):
+        i = entry_index[k]
+        direction = entry_direction[k]
+        entry_price = prices[i]
+        reverse_at = next_long_reverse[i + 1] if direction > 0 else next_short_reverse[i + 1]
+        stop = min(reverse_at, n - 1)
+
+        # Position return is direction * move, so both sides trigger on the same raw price move
+        # (a short's "stop_loss" fires at move <= -STOP_LOSS_PCT, matching the original rules)
+        reason = -1
+        j = i + 1
+        move = 0.0
+        while j <= stop:
+            move = (prices[j] - entry_price) / entry_price
+            if move <= -stop_loss_pct:
+                reason = STOP_LOSS
+                break
+            if move >= take_profit_pct:
+                reason = TAKE_PROFIT
+                break
+            j += 1
+
+        if reason < 0:
+            if reverse_at < n:
+                j = reverse_at
+                reason = SIGNAL_REVERSE
+            else:
+                j = n - 1
+                reason = END_OF_DATA
+            move = (prices[j] - entry_price) / entry_price
+
+        exit_index[k] = j
+        exit_return[k] = direction * move
+        exit_reason[k] = reason
+
+    return exit_index, exit_return, exit_reason
+
+
+# Closed trades are written straight into a preallocated record buffer
+TRADE_DTYPE = np.dtype([
+    ("entry_index", np.int64),
+    ("exit_index", np.int64),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("direction", np.int8),  # 1 long, -1 short
+    ("return", np.float64),
+    ("capital_allocated", np.float64),
+    ("profit_loss", np.float64),
+    ("reason", np.int8),  # index into EXIT_REASONS
+])
+
+
+@njit(cache=True)
+def replay_trades(order, event_pos, event_is_entry, entry_index, entry_direction, exit_index,
+                  exit_return, exit_reason, prices, initial_capital, position_size_pct, trades_buf):
+    """Apply entry/exit events in order, recording each closed trade; returns final capital and trade count."""
+    m = len(exit_return)
+    capital = initial_capital
+    capital_allocated = np.zeros(m, dtype=np.float64)
+    opened = np.zeros(m, dtype=np.bool_)
+    n_trades = 0
+    for e in order:
+        k = event_pos[e]
+        if event_is_entry[e]:
+            capital_to_use = capital * position_size_pct
+            if capital_to_use > 0:
+                capital -= capital_to_use
+                capital_allocated[k] = capital_to_use
+                opened[k] = True
+        elif opened[k]:
+            profit_loss = capital_allocated[k] * exit_return[k]
+            capital += capital_allocated[k] + profit_loss  # Return capital + P/L
+            trade = trades_buf[n_trades]
+            trade["entry_index"] = entry_index[k]
+            trade["exit_index"] = exit_index[k]
+            trade["entry_price"] = prices[entry_index[k]]
+            trade["exit_price"] = prices[exit_index[k]]
+            trade["direction"] = entry_direction[k]
+            trade["return"] = exit_return[k]
+            trade["capital_allocated"] = capital_allocated[k]
+            trade["profit_loss"] = profit_loss
+            trade["reason"] = exit_reason[k]
+            n_trades += 1
+    return capital, n_trades
+
+
+entry_index = np.flatnonzero(long_entry | short_entry)
+entry_direction = np.where(long_entry[entry_index], 1, -1).astype(np.int8)
+exit_index, exit_return, exit_reason = find_exits(
+    prices, entry_index, entry_direction, next_long_reverse, next_short_reverse,
+    STOP_LOSS_PCT, TAKE_PROFIT_PCT
+)
+
+# Capital is the only sequential dependency: replay entry/exit events in bar order.
+# Within a bar, exits (in entry order) settle before that bar's new entry;
+# positions still open at the end of the data are settled last.
+m = len(entry_index)
+exit_key = np.where(exit_reason == END_OF_DATA, n, exit_index)
+event_bar = np.concatenate([exit_key, entry_index])
+event_is_entry = np.concatenate([np.zeros(m, dtype=bool), np.ones(m, dtype=bool)])
+event_pos = np.concatenate([np.arange(m), np.arange(m)])
+order = np.lexsort((event_pos, event_is_entry, event_bar))
+
+trades_buf = np.empty(m, dtype=TRADE_DTYPE)
+capital, n_trades = replay_trades(
+    order, event_pos, event_is_entry, entry_index, entry_direction, exit_index,
+    exit_return, exit_reason, prices, float(INITIAL_CAPITAL), POSITION_SIZE_PCT, trades_buf
+)
+trades_df = pd.DataFrame.from_records(trades_buf[:n_trades])
+trades_df["direction"] = np.where(trades_df["direction"] == 1, "long", "short")
+trades_df["reason"] = EXIT_REASONS[trades_df["reason"].to_numpy()]
+
 print(f"Classifier prob min: {clf_probs.min()}, max: {clf_probs.max()}")
 print(f"Regressor pred min: {reg_preds.min()}, max: {reg_preds.max()}")
 
@@ -1,9 +1,11 @@
+import asyncio
+import csv
 import time
 from datetime import datetime, timedelta
-import pandas as pd
+import numpy as np
+from pandas.api.types import is_numeric_dtype
 import logging
 from src.alpaca_api import User_Actions
-from src.trading_strategy import build_features
 
 """
 Live Trading Bot for Alpaca Using Classifier + Regressor Strategy
@@ -29,7 +31,8 @@ Key Features:
 - **Data Pipeline**:
     - Live prices, positions, and historical OHLCV data fetched from Alpaca
     - Feature engineering using the same `build_features` method from training
-    - Real-time predictions using loaded XGBoost models
+      (applied once per symbol inside `User_Actions.get_historical_data`)
+    - Real-time predictions using the loaded XGBoost boosters (`inplace_predict`)
 - **Structure**:
     - Entry and exit logic executed in a continuous loop (every 60 seconds)
     - Ensures market is open before executing
@@ -38,8 +41,8 @@ Key Features:
 This script is designed for running in a production or paper trading environment 
 and assumes the presence of:
 - `User_Actions` class for interacting with Alpaca API
-- Pre-trained classifier and regressor models
-- A feature builder function (`build_features`) compatible with your model inputs
+- Pre-trained classifier and regressor models, passed in as native `xgboost.Booster`s
+- A feature builder function (`build_features`, applied by `User_Actions`) compatible with your model inputs
 """
 
 actions = User_Actions()
@@ -60,24 +63,31 @@ logging.basicConfig(level=logging.INFO, filename="bot.log", filemode="a",
                     format="%(asctime)s - %(levelname)s - %(message)s")
 
 # log trades 
+TRADE_LOG_COLUMNS = ["timestamp", "symbol", "action", "price", "qty", "reason", "direction"]
+_trade_log_file = None
+_trade_log_writer = None
+
+def _get_trade_log_writer():
+    # Opened once on first use and kept open; the header is written only for a new/empty file
+    global _trade_log_file, _trade_log_writer
+    if _trade_log_writer is None:
+        _trade_log_file = open(TRADE_LOG_PATH, "a", newline="", buffering=8192)
+        _trade_log_writer = csv.writer(_trade_log_file)
+        if _trade_log_file.tell() == 0:
+            _trade_log_writer.writerow(TRADE_LOG_COLUMNS)
+    return _trade_log_writer
+
 def log_trade(symbol, action, price, qty, reason, direction):
-    record = {
-        "timestamp": datetime.now().isoformat(),
-        "symbol": symbol,
-        "action": action,
-        "price": price,
-        "qty": qty,
-        "reason": reason,
-        "direction": direction
-    }
-    df = pd.DataFrame([record])
-    if not pd.io.common.file_exists(TRADE_LOG_PATH):
-        df.to_csv(TRADE_LOG_PATH, index=False)
-    else:
-        df.to_csv(TRADE_LOG_PATH, mode='a', index=False, header=False)
+    writer = _get_trade_log_writer()
+    writer.writerow([datetime.now().isoformat(), symbol, action, price, qty, reason, direction])
+    _trade_log_file.flush()
 
 # Bot
 def run_trading_bot(classifier, regressor, clf_threshold=0.58, reg_threshold=0.002):
+    # Fixed for the life of the bot: trading universe and model inputs (in training order)
+    watchlist = actions.get_watchlist_symbols()
+    expected_columns = classifier.feature_names
+
     while True:
         try:
             if not actions.is_market_open():
@@ -86,17 +96,19 @@ def run_trading_bot(classifier, regressor, clf_threshold=0.58, reg_threshold=0.0
                 time.sleep(60)
                 continue
 
-            watchlist = actions.get_watchlist_symbols()
-            prices = actions.get_prices(watchlist)
-            raw_positions = actions.get_positions()
+            prices, raw_positions = asyncio.run(actions.get_market_snapshot_async(watchlist))
             position_symbols = set(raw_positions)
             cash = float(actions.get_cash_balance())
 
             print(f"Watchlist: {watchlist}, Cash: {cash}")
 
-            for symbol in watchlist:
-                now = datetime.now()
+            # One timestamp per cycle keeps cooldown checks consistent across symbols
+            now = datetime.now()
 
+            # Build features per symbol, then score the whole watchlist in one call
+            candidates = []
+            latest_rows = []
+            for symbol in watchlist:
                 # Skip if cooling down
                 if symbol in cooldown_tracker and now < cooldown_tracker[symbol]:
                     print(f"{symbol} is cooling down")
@@ -107,24 +119,39 @@ def run_trading_bot(classifier, regressor, clf_threshold=0.58, reg_threshold=0.0
                     print(f"Max trades reached, skipping {symbol}")
                     continue
 
+                # Returned with features already built (see User_Actions.get_intraday_yfinance)
                 df = actions.get_historical_data(symbol, timeframe='1Min', limit=400)
                 if df is None or df.empty:
                     print(f"No historical data for {symbol}")
                     continue
-                df = build_features(df)
-            
-                if df.empty:
-                    print(f"Features build returned empty DataFrame for {symbol}")
+
+                feature_idx = df.columns.get_indexer(expected_columns)
+                if (feature_idx < 0).any():
+                    print(f"Missing model features for {symbol}")
                     continue
 
-                latest = df.iloc[[-1]]  #
-                expected_columns = classifier.get_booster().feature_names
-                X = latest[expected_columns]
+                candidates.append(symbol)
+                # Converting the whole last row and gathering the model columns in NumPy is cheapest,
+                # but only when every column is numeric; otherwise just the model columns are converted
+                last_row = df.iloc[-1:]
+                if all(is_numeric_dtype(dtype) for dtype in last_row.dtypes):
+                    latest_rows.append(last_row.to_numpy(dtype=np.float32)[:, feature_idx])
+                else:
+                    latest_rows.append(last_row.iloc[:, feature_idx].to_numpy(dtype=np.float32))
+
+            if not candidates:
+                time.sleep(60)
+                continue
 
-                prob = classifier.predict_proba(X)[0][1]
+            X_all = np.vstack(latest_rows)
+            probs = classifier.inplace_predict(X_all)  # binary:logistic -> P(up)
+            pred_returns = regressor.inplace_predict(X_all)
 
-                pred_return = regressor.predict(X)[0]
+            for symbol, prob, pred_return in zip(candidates, probs, pred_returns):
                 price = prices.get(symbol)
+                if price is None:
+                    logging.warning(f"No price available for {symbol}")
+                    continue
 
                 trade = active_trades.get(symbol)
                 is_active = symbol in position_symbols and trade is not None
@@ -132,14 +159,7 @@ def run_trading_bot(classifier, regressor, clf_threshold=0.58, reg_threshold=0.0
                 
                 # --- Entry Logic ---
                 if not is_active:
-                    try:
-                        current_price = price.iloc[0]
-                    except Exception as e:
-                        logging.warning(f"Failed to extract price for {symbol}: {e}")
-                        continue
-
-
-                    qty = int((cash * 0.1) // current_price)  # 10% of cash per trade
+                    qty = int((cash * 0.1) // price)  # 10% of cash per trade
                     if qty <= 0:
                         continue
 
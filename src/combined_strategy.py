@@ -1,7 +1,9 @@
+import os
 import pandas as pd
-import joblib
+import xgboost as xgb
 import numpy as np
 import matplotlib.pyplot as plt
+from src.file_cache import fingerprint, cache_path, save_arrays
 
 """
 Model Evaluation and Strategy Simulation for Stock Price Predictions
@@ -16,6 +18,7 @@ Key Components:
 - **Prediction Logic**:
     - Classifier outputs probability of positive return
     - Regressor predicts expected future return
+    - Predictions are cached in `cache/` (keyed on model/data file times and sizes and the feature list; older entries are deleted) so threshold re-runs skip inference
 - **Trade Signal Logic**:
     - **Long entry**: Classifier probability > 0.58 AND Regressor prediction > 0.002
     - **Short entry**: Classifier probability < 0.25 AND Regressor prediction < -0.0065
@@ -31,24 +34,19 @@ This script is designed to assess how well the combined classifier-regressor mod
 when both agree on trade direction, simulating a basic long/short trading strategy.
 """
 
-# Load data
-df = pd.read_parquet("data/dataprocessed/training_data.parquet")
-features = [
-    col for col in df.columns
-    if col not in ['target', 'target_return', 'future_close', 'symbol', 'index']
-]
+DATA_PATH = "data/dataprocessed/training_data.parquet"
+CLF_MODEL_PATH = "models/best_xgb_classifier.ubj"
+REG_MODEL_PATH = "models/best_xgb_regressor.ubj"
 
-X = df[features]
-true_returns = df['target_return']
-true_labels = df['target']
+# Thresholds
+CLF_THRESHOLD = 0.58
+REG_THRESHOLD = 0.002
+SHORT_CLF_THRESHOLD = 0.25
+SHORT_REG_THRESHOLD = -0.0065
 
-# Load models
-clf_model = joblib.load("models/best_xgb_classifier.pkl")  
-reg_model = joblib.load("models/best_xgb_regressor.pkl")
 
 # ----------- Feature Importance Analysis ------------
-def plot_feature_importance(model, title, feature_names, top_n=20):
-    booster = model.get_booster()
+def plot_feature_importance(booster, title, feature_names, top_n=20):
     importance_dict = booster.get_score(importance_type='gain')
     importance = pd.Series(importance_dict).reindex(feature_names).fillna(0)
     importance = importance.sort_values(ascending=False).head(top_n)
@@ -61,94 +59,131 @@ def plot_feature_importance(model, title, feature_names, top_n=20):
     plt.tight_layout()
     plt.show()
 
-print("\nTop Feature Importances - Classifier")
-plot_feature_importance(clf_model, "Top Classifier Feature Importances", features)
 
-print("\nTop Feature Importances - Regressor")
-plot_feature_importance(reg_model, "Top Regressor Feature Importances", features)
+def run_strategy(short_clf_threshold=SHORT_CLF_THRESHOLD, short_reg_threshold=SHORT_REG_THRESHOLD,
+                 clf_threshold=CLF_THRESHOLD, reg_threshold=REG_THRESHOLD):
+    # Load models
+    clf_booster = xgb.Booster(model_file=CLF_MODEL_PATH)
+    reg_booster = xgb.Booster(model_file=REG_MODEL_PATH)
 
+    # Load data: only the model inputs and the realised return are decoded from the file
+    features = clf_booster.feature_names
+    df = pd.read_parquet(DATA_PATH, columns=features + ['target_return'])
 
-# ----------- Predictions & Strategy Evaluation ------------
+    true_returns = df['target_return']
 
-# Classifier predictions
-clf_probs = clf_model.predict_proba(X)[:, 1]  # Probability of "up"
-clf_preds = clf_model.predict(X)
+    # ----------- Feature Importance Analysis ------------
+    print("\nTop Feature Importances - Classifier")
+    plot_feature_importance(clf_booster, "Top Classifier Feature Importances", features)
 
-# Regression predictions
-reg_preds = reg_model.predict(X)
+    print("\nTop Feature Importances - Regressor")
+    plot_feature_importance(reg_booster, "Top Regressor Feature Importances", features)
 
-# Thresholds
-clf_threshold = 0.58
-reg_threshold = 0.002
-
-# Long trade conditions
-long_clf_mask = clf_probs > clf_threshold
-long_reg_mask = reg_preds > reg_threshold
-long_mask = long_clf_mask & long_reg_mask
-
-# Short trade conditions 
-short_clf_mask = clf_probs < 0.25
-short_reg_mask = reg_preds < -0.0065
-short_mask = short_clf_mask & short_reg_mask
-
-# Combine all trades 
-final_mask = long_mask | short_mask
-
-# Create direction array for selected trades
-direction = np.full(len(df), 'none', dtype=object)
-direction[long_mask] = 'long'
-direction[short_mask] = 'short'
-
-# Selected trades 
-selected = df[final_mask].copy()
-selected['predicted_return'] = reg_preds[final_mask]
-selected['true_return'] = true_returns[final_mask]
-selected['direction'] = direction[final_mask]
-
-# Adjust returns for shorts
-selected['adjusted_return'] = np.where(
-    selected['direction'] == 'short',
-    -selected['true_return'],
-    selected['true_return']
-)
-
-selected['was_profitable'] = selected['adjusted_return'] > 0
-
-# ----------- Reporting ------------
-
-print(f"\nTotal samples: {len(df)}")
-print(f"Long trades: {long_mask.sum()}")
-print(f"Short trades: {short_mask.sum()}")
-print(f"Final trades selected: {final_mask.sum()}")
-
-print(f"\nAverage predicted return: {selected['predicted_return'].mean():.4f}")
-print(f"Average true return (adjusted): {selected['adjusted_return'].mean():.4f}")
-print(f"Win rate: {selected['was_profitable'].mean():.2%}")
-
-# ----------- Plots ------------
-
-selected['cum_return'] = (1 + selected['adjusted_return']).cumprod()
-plt.figure(figsize=(10, 4))
-plt.title("Cumulative Return (Long + Short Strategy)")
-plt.plot(selected['cum_return'])
-plt.xlabel("Trade Index")
-plt.ylabel("Cumulative Return")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-plt.figure(figsize=(10, 4))
-plt.hist(clf_probs, bins=50, alpha=0.6, label='Number predicted')
-plt.axvline(clf_threshold, color='red', linestyle='--', label='Long Threshold')
-plt.axvline(0.23, color='purple', linestyle='--', label='Short Threshold')
-plt.title("Classifier Probability Distribution")
-plt.legend()
-plt.show()
-
-plt.figure(figsize=(10, 4))
-plt.hist(reg_preds, bins=50, alpha=0.6, label='Regression Predicted Returns')
-plt.axvline(reg_threshold, color='green', linestyle='--', label='Long Reg Threshold')
-plt.axvline(-0.0085, color='orange', linestyle='--', label='Short Reg Threshold')
-plt.title("Regressor Predicted Return Distribution")
-plt.legend()
-plt.show()
+
+    # ----------- Predictions & Strategy Evaluation ------------
+
+
+    # Predictions only change with the models, the data or the feature list, so re-runs that
+    # just move thresholds reuse the cached arrays (only the newest entry is kept)
+    preds_cache = cache_path("preds", fingerprint([CLF_MODEL_PATH, REG_MODEL_PATH, DATA_PATH], features))
+
+    if os.path.exists(preds_cache):
+        print(f"Loading cached predictions from {preds_cache}")
+        cached = np.load(preds_cache)
+        clf_probs = cached['clf_probs']
+        reg_preds = cached['reg_preds']
+    else:
+        # Both models score the same contiguous float32 array straight on the booster, so the
+        # frame is converted once instead of once per predict call. A raw array carries no column
+        # names, so columns are taken in the booster's own feature order.
+        X = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+
+        # Classifier predictions
+        clf_probs = clf_booster.inplace_predict(X)  # binary:logistic -> probability of "up"
+
+        # Regression predictions
+        reg_preds = reg_booster.inplace_predict(X)
+
+        save_arrays(preds_cache, clf_probs=clf_probs, reg_preds=reg_preds)
+
+    # Masks are combined in place; the regressor comparison reuses one scratch buffer
+    scratch = np.empty(len(clf_probs), dtype=bool)
+
+    # Long trade conditions
+    long_mask = np.greater(clf_probs, clf_threshold)
+    long_mask &= np.greater(reg_preds, reg_threshold, out=scratch)
+
+    # Short trade conditions
+    short_mask = np.less(clf_probs, short_clf_threshold)
+    short_mask &= np.less(reg_preds, short_reg_threshold, out=scratch)
+
+    # Direction for every row in one pass: 1 long, -1 short, 0 no trade
+    # (boolean masks are viewed as 0/1 int8 without copying)
+    direction = long_mask.view(np.int8) - short_mask.view(np.int8)
+
+    # Combine all trades
+    final_mask = direction != 0
+
+    # Selected trades: gather only the handful of arrays the report uses, by position,
+    # instead of copying every column of the selected rows
+    idx = np.flatnonzero(final_mask)
+    true_sel = true_returns.to_numpy()[idx]
+    dir_sel = direction[idx]
+
+    selected = pd.DataFrame({
+        'predicted_return': reg_preds[idx],
+        'true_return': true_sel,
+        'direction': pd.Categorical.from_codes(dir_sel + 1, categories=['short', 'none', 'long']),
+        # Adjust returns for shorts
+        'adjusted_return': true_sel * dir_sel,
+    }, index=df.index[idx])
+
+    selected['was_profitable'] = selected['adjusted_return'] > 0
+
+    # ----------- Reporting ------------
+
+    print(f"\nTotal samples: {len(df)}")
+    print(f"Long trades: {long_mask.sum()}")
+    print(f"Short trades: {short_mask.sum()}")
+    print(f"Final trades selected: {final_mask.sum()}")
+
+    print(f"\nAverage predicted return: {selected['predicted_return'].mean():.4f}")
+    print(f"Average true return (adjusted): {selected['adjusted_return'].mean():.4f}")
+    print(f"Win rate: {selected['was_profitable'].mean():.2%}")
+
+    # ----------- Plots ------------
+
+    selected['cum_return'] = (1 + selected['adjusted_return']).cumprod()
+    plt.figure(figsize=(10, 4))
+    plt.title("Cumulative Return (Long + Short Strategy)")
+    plt.plot(selected['cum_return'])
+    plt.xlabel("Trade Index")
+    plt.ylabel("Cumulative Return")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+    # Bin with NumPy's uniform-bin path and draw one filled step artist rather than 50 bar patches
+    plt.figure(figsize=(10, 4))
+    counts, edges = np.histogram(clf_probs, bins=50)
+    plt.stairs(counts, edges, fill=True, alpha=0.6, label='Number predicted')
+    plt.axvline(clf_threshold, color='red', linestyle='--', label='Long Threshold')
+    plt.axvline(short_clf_threshold, color='purple', linestyle='--', label='Short Threshold')
+    plt.title("Classifier Probability Distribution")
+    plt.legend()
+    plt.show()
+
+    plt.figure(figsize=(10, 4))
+    counts, edges = np.histogram(reg_preds, bins=50)
+    plt.stairs(counts, edges, fill=True, alpha=0.6, label='Regression Predicted Returns')
+    plt.axvline(reg_threshold, color='green', linestyle='--', label='Long Reg Threshold')
+    plt.axvline(short_reg_threshold, color='orange', linestyle='--', label='Short Reg Threshold')
+    plt.title("Regressor Predicted Return Distribution")
+    plt.legend()
+    plt.show()
+
+    return selected
+
+
+if __name__ == "__main__":
+    run_strategy()
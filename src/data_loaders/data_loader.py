@@ -1,22 +1,23 @@
 import os
 import pandas as pd
 from datetime import datetime, timedelta
-import time
+from concurrent.futures import ThreadPoolExecutor
 import alpaca_trade_api as tradeapi
 from src.keys.live_config import API_KEY, SECRET_KEY, BASE_URL
+from src.rate_limit import RateLimiter
 
 """
 Alpaca 1-Minute Historical Data Fetcher and Saver
 
-This script uses the Alpaca Markets API to fetch 1-minute historical bar data for a list of stock symbols. The data is collected in 30-day chunks (to avoid API limitations), aggregated, and saved in Parquet format for each symbol.
+This script uses the Alpaca Markets API to fetch 1-minute historical bar data for a list of stock symbols. The data is collected in 14-day chunks, each small enough to arrive in a single page of at most 10,000 bars (one API request), aggregated, and saved in Parquet format for each symbol.
 
 Main Workflow:
 --------------
 1. Authenticates with Alpaca using API credentials (`live_config.py`).
-2. Iterates over a list of stock symbols.
-3. For each symbol:
-    - Loops through the date range in 30-day intervals.
-    - Fetches 1-minute bar data (`get_bars`) using IEX feed.
+2. Splits the date range into 14-day intervals.
+3. Fetches 1-minute bar data (`get_bars`, IEX feed) for every symbol/interval pair concurrently,
+   on a thread pool sharing one rate limiter (200 requests/minute).
+4. For each symbol:
     - Aggregates and sorts the resulting DataFrame.
     - Saves the data to `data/dataraw/<symbol>.parquet`.
 
@@ -42,36 +43,67 @@ Dependencies:
 
 api = tradeapi.REST(API_KEY, SECRET_KEY, BASE_URL, api_version='v2')
 
+# Chunk requests are network-bound, so several run at once; the shared rate limiter
+# keeps the combined request rate within Alpaca's 200 requests/minute
+MAX_FETCH_WORKERS = 8
+rate_limiter = RateLimiter(max_calls=200, period=60)
+
+# get_bars pages through results 10,000 bars per request. 14 calendar days hold at most
+# 10 weekdays x 960 extended-hours minutes = 9,600 bars, so one chunk is one request.
+PAGE_LIMIT = 10000
+CHUNK_DAYS = 14
+
+
+def fetch_chunk(symbol, timeframe, start_str, end_str):
+    rate_limiter.acquire()
+    bars = api.get_bars(symbol, timeframe, start=start_str, end=end_str, limit=PAGE_LIMIT, feed='iex').df
+    if len(bars) >= PAGE_LIMIT:
+        print(f"Warning: {symbol} from {start_str} to {end_str} hit the {PAGE_LIMIT}-bar page limit, data may be truncated")
+    return bars
+
+
 def fetch_and_save_data(symbols, start_date, end_date, 
                         timeframe='1Min', 
                         save_dir="data/dataraw"):
     os.makedirs(save_dir, exist_ok=True)
 
-    for symbol in symbols:
-        print(f"Fetching {symbol} data from {start_date.date()} to {end_date.date()}...")
-        df_all = []
-        current = start_date
-
-        while current < end_date:
-            next_chunk = min(current + timedelta(days=30), end_date)
-            start_str = current.replace(microsecond=0).isoformat() + "Z"
-            end_str = next_chunk.replace(microsecond=0).isoformat() + "Z"
-
-            bars = api.get_bars(symbol, timeframe, start=start_str, end=end_str, feed='iex').df
-            if bars.empty:
-                print(f"No data for {symbol} from {current.date()} to {next_chunk.date()}")
+    chunks = []
+    current = start_date
+    while current < end_date:
+        next_chunk = min(current + timedelta(days=CHUNK_DAYS), end_date)
+        chunks.append((current, next_chunk))
+        current = next_chunk
+
+    print(f"Fetching {len(symbols)} symbols from {start_date.date()} to {end_date.date()} "
+          f"({len(symbols) * len(chunks)} requests)...")
+
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        # Submit every (symbol, chunk) request up front, then collect per symbol in date order
+        futures = {
+            (symbol, i): executor.submit(
+                fetch_chunk, symbol, timeframe,
+                chunk_start.replace(microsecond=0).isoformat() + "Z",
+                chunk_end.replace(microsecond=0).isoformat() + "Z"
+            )
+            for symbol in symbols
+            for i, (chunk_start, chunk_end) in enumerate(chunks)
+        }
+
+        for symbol in symbols:
+            df_all = []
+            for i, (chunk_start, chunk_end) in enumerate(chunks):
+                bars = futures[(symbol, i)].result()
+                if bars.empty:
+                    print(f"No data for {symbol} from {chunk_start.date()} to {chunk_end.date()}")
+                else:
+                    df_all.append(bars)
+
+            if df_all:
+                full_df = pd.concat(df_all).sort_index()
+                full_df.to_parquet(os.path.join(save_dir, f"{symbol}.parquet"))
+                print(f"Saved {symbol} with {len(full_df)} rows in {save_dir}")
             else:
-                df_all.append(bars)
-
-            current = next_chunk
-            time.sleep(1)
-
-        if df_all:
-            full_df = pd.concat(df_all).sort_index()
-            full_df.to_parquet(os.path.join(save_dir, f"{symbol}.parquet"))
-            print(f"Saved {symbol} with {len(full_df)} rows in {save_dir}")
-        else:
-            print(f"No data collected for {symbol}")
+                print(f"No data collected for {symbol}")
 
 if __name__ == "__main__":
     symbols = ['AAPL', 'MSFT', 'SMCI', 'AMD', 'GOOGL', 'META', 'AMZN', 'INMD', 
@@ -0,0 +1,50 @@
+import glob
+import hashlib
+import os
+import numpy as np
+
+"""
+On-Disk Array Cache Helpers
+
+Shared by the scripts that cache NumPy arrays derived from data and model files in `cache/`
+(training arrays, strategy predictions). Entries are keyed on a fingerprint of the input files
+(modification time and size) plus anything else the arrays depend on, and each cache prefix
+keeps only its newest entry, so stale copies never pile up. Entries are written atomically, so
+an interrupted run never leaves a truncated file behind.
+
+Usage:
+------
+    path = cache_path("clf_train", fingerprint([DATA_PATH], features))
+    if os.path.exists(path):
+        X = np.load(path)['X']
+    else:
+        ...
+        save_arrays(path, X=X)
+"""
+
+CACHE_DIR = "cache"
+
+
+def fingerprint(paths, *extra):
+    parts = [f"{path}:{os.path.getmtime(path)}:{os.path.getsize(path)}" for path in paths]
+    parts += [repr(item) for item in extra]
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def cache_path(prefix, key):
+    # Any older entry under the same prefix belongs to a previous version of the inputs
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{prefix}_{key}.npz")
+    for old in glob.glob(os.path.join(CACHE_DIR, f"{prefix}_*.npz")):
+        if old != path:
+            os.remove(old)
+    return path
+
+
+def save_arrays(path, **arrays):
+    # Written under a temporary name first and renamed into place, so readers only ever see
+    # a complete file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
@@ -0,0 +1,231 @@
+import numpy as np
+from numba import njit, prange
+
+"""
+Vectorized Feature Kernels
+
+NumPy/Numba implementations of the rolling statistics and technical indicators used by feature
+engineering, operating on plain float64 arrays instead of pandas Series. Outputs follow pandas
+and `ta` semantics (same warm-up NaNs, same defaults), so they are drop-in replacements.
+
+Functions:
+----------
+- `rolling_mean_std(values, windows, ddof=1)` – rolling mean and std for several windows,
+  computed in one compiled pass per window (windows in parallel)
+- `pct_change(values, periods)` – return over `periods` rows, as `Series.pct_change(periods)`
+- `ema(values, span)` – exponential moving average, as `Series.ewm(span, adjust=False)`
+- `rsi(close, window=14)` – as `ta.momentum.RSIIndicator(close).rsi()`
+- `macd(close, window_slow=26, window_fast=12)` – as `ta.trend.MACD(close).macd()`
+- `macd_signal(close, window_slow=26, window_fast=12, window_sign=9)` – as `ta.trend.MACD(close).macd_signal()`
+- `bollinger_bands(close, window=20, window_dev=2)` – (high, low) bands, as `ta.volatility.BollingerBands`
+- `on_balance_volume(close, volume)` – as `ta.volume.OnBalanceVolumeIndicator(...).on_balance_volume()`
+- `vwap_log_return(close, volume)` – (cumulative VWAP, 1-row log return) from one sweep, as
+  `(close * volume).cumsum() / volume.cumsum()` and `np.log(close / close.shift(1))`
+- `price_change_count(close, window=5)` – price changes over the last `window` rows, as
+  `close.diff().ne(0).astype(int).rolling(window).sum()`
+"""
+
+
+@njit(parallel=True, cache=True)
+def _rolling_mean_std(x, windows, ddof):
+    # One pass per window using pandas' own add/remove updates (Kahan-compensated sum for the
+    # mean, Welford sum of squared deviations for the std), so results track pandas closely;
+    # windows are independent so they run in parallel
+    n = len(x)
+    means = np.full((len(windows), n), np.nan)
+    stds = np.full((len(windows), n), np.nan)
+    for k in prange(len(windows)):
+        w = windows[k]
+        nobs = 0
+        sum_x = 0.0
+        sum_comp = 0.0
+        mean_x = 0.0
+        ssqdm_x = 0.0
+        comp = 0.0
+        same_run = 0
+        prev_value = np.nan
+        for i in range(n):
+            # Drop the value leaving the window first, then add the new one (pandas order)
+            if i >= w:
+                old = x[i - w]
+                if old == old:
+                    nobs -= 1
+                    y = -old - sum_comp
+                    t = sum_x + y
+                    sum_comp = t - sum_x - y
+                    sum_x = t
+                    if nobs:
+                        prev_mean = mean_x - comp
+                        y = old - comp
+                        t = y - mean_x
+                        comp = t + mean_x - y
+                        mean_x -= t / nobs
+                        ssqdm_x -= (old - prev_mean) * (old - mean_x)
+                    else:
+                        mean_x = 0.0
+                        ssqdm_x = 0.0
+            val = x[i]
+            if val == val:
+                same_run = same_run + 1 if val == prev_value else 1
+                prev_value = val
+                nobs += 1
+                y = val - sum_comp
+                t = sum_x + y
+                sum_comp = t - sum_x - y
+                sum_x = t
+                prev_mean = mean_x - comp
+                y = val - comp
+                t = y - mean_x
+                comp = t + mean_x - y
+                mean_x += t / nobs
+                ssqdm_x += (val - prev_mean) * (val - mean_x)
+            if i >= w - 1 and nobs == w:
+                if same_run >= nobs:
+                    # Constant window: exact mean, zero spread
+                    means[k, i] = prev_value
+                    stds[k, i] = 0.0
+                else:
+                    means[k, i] = sum_x / nobs
+                    stds[k, i] = np.sqrt(max(ssqdm_x / (nobs - ddof), 0.0))
+    return means, stds
+
+
+def rolling_mean_std(values, windows, ddof=1):
+    x = np.ascontiguousarray(values, dtype=np.float64)
+    means, stds = _rolling_mean_std(x, np.asarray(windows, dtype=np.int64), ddof)
+    return {w: (means[k], stds[k]) for k, w in enumerate(windows)}
+
+
+def pct_change(values, periods):
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) > periods:
+        out[periods:] = x[periods:] / x[:-periods] - 1
+    return out
+
+
+@njit(cache=True)
+def _ewm_mean(values, com, min_periods):
+    # Same recursion as pandas' ewm(adjust=False, ignore_na=False).mean(), so results match bit
+    # for bit: the old weight keeps decaying across NaN rows and is reset after each observation
+    n = len(values)
+    out = np.empty(n)
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    if n == 0:
+        return out
+    weighted = values[0]
+    nobs = 1 if weighted == weighted else 0
+    out[0] = weighted if nobs >= min_periods else np.nan
+    new_wt = alpha
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = values[i]
+        is_observation = cur == cur
+        if is_observation:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if com == 1:
+                # pandas re-derives the new weight from the decayed one in this case
+                new_wt = 1.0 - old_wt
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted if nobs >= min_periods else np.nan
+    return out
+
+
+def ema(values, span):
+    x = np.asarray(values, dtype=np.float64)
+    return _ewm_mean(x, (span - 1) / 2.0, span)
+
+
+def rsi(close, window=14):
+    x = np.asarray(close, dtype=np.float64)
+    diff = np.empty_like(x)
+    diff[:1] = np.nan
+    diff[1:] = x[1:] - x[:-1]
+    up = np.where(diff > 0, diff, 0.0)
+    down = -np.where(diff < 0, diff, 0.0)
+    com = 1.0 / (1.0 / window) - 1.0
+    ema_up = _ewm_mean(up, com, window)
+    ema_down = _ewm_mean(down, com, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def macd(close, window_slow=26, window_fast=12):
+    return ema(close, window_fast) - ema(close, window_slow)
+
+
+def macd_signal(close, window_slow=26, window_fast=12, window_sign=9):
+    # The EMA starts at the first defined MACD value, after the slow EMA's warm-up NaNs
+    return ema(macd(close, window_slow, window_fast), window_sign)
+
+
+def bollinger_bands(close, window=20, window_dev=2):
+    mean, std = rolling_mean_std(close, [window], ddof=0)[window]
+    return mean + window_dev * std, mean - window_dev * std
+
+
+def on_balance_volume(close, volume):
+    x = np.asarray(close, dtype=np.float64)
+    v = np.asarray(volume)
+    falling = np.zeros(len(x), dtype=bool)
+    falling[1:] = x[1:] < x[:-1]
+    return np.cumsum(np.where(falling, -v, v))
+
+
+@njit(cache=True, error_model='numpy')
+def _vwap_log_return(c, v):
+    # Both running sums and the price ratio come out of one pass over close/volume; NaNs are
+    # skipped by the sums (but give NaN at their own row) as in pandas' cumsum
+    n = len(c)
+    vwap = np.empty(n)
+    ratio = np.empty(n)
+    pv_cum = 0.0
+    v_cum = 0.0
+    for i in range(n):
+        pv = c[i] * v[i]
+        if pv == pv:
+            pv_cum += pv
+        if v[i] == v[i]:
+            v_cum += v[i]
+        vwap[i] = pv_cum / v_cum if pv == pv and v[i] == v[i] else np.nan
+        ratio[i] = c[i] / c[i - 1] if i else np.nan
+    return vwap, ratio
+
+
+def vwap_log_return(close, volume):
+    vwap, log_return = _vwap_log_return(np.ascontiguousarray(close, dtype=np.float64),
+                                        np.ascontiguousarray(volume, dtype=np.float64))
+    # NumPy's log in place, so values match np.log(close / close.shift(1)) exactly
+    np.log(log_return, out=log_return)
+    return vwap, log_return
+
+
+@njit(cache=True)
+def _price_change_count(x, window):
+    # One sweep: a ring buffer holds the changed/unchanged flags of the current window and a
+    # running count is updated as flags enter and leave it. The first row and any NaN
+    # comparison count as a change, as with diff().ne(0)
+    n = len(x)
+    out = np.full(n, np.nan)
+    ring = np.zeros(window, dtype=np.int64)
+    count = 0
+    for i in range(n):
+        changed = 1 if i == 0 or x[i] - x[i - 1] != 0 else 0
+        slot = i % window
+        count += changed - ring[slot]
+        ring[slot] = changed
+        if i >= window - 1:
+            out[i] = count
+    return out
+
+
+def price_change_count(close, window=5):
+    return _price_change_count(np.ascontiguousarray(close, dtype=np.float64), window)
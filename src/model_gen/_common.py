@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+from src.file_cache import fingerprint, cache_path, save_arrays
+
+"""
+Shared helpers for the model training scripts (`classifier.py`, `regression.py`).
+
+- `EXCLUDE` – label, future-leakage and metadata columns that are never model inputs
+- `feature_cols(path)` – model feature columns of a processed Parquet file, read from its schema
+- `load_training_arrays(prefix, path, features, label, dtype)` – (X, y) arrays of a processed file,
+  from the `cache/` entry under `prefix` when the file and feature list are unchanged
+- `chronological_split(X, y)` – (fit, validation, test) slices of X/y, in time order
+- `DEVICE`, `BASE_PARAMS` – training device and the tree settings both models share
+- `fit_booster(params, lr, dtrain, dval, num_boost_round, n_threads)` – one early-stopped fit,
+  trimmed to its best round and set to predict on CPU
+"""
+
+EXCLUDE = frozenset({'target', 'target_return', 'future_close', 'symbol', 'index'})
+
+# Training device: set XGB_DEVICE=cuda to build histograms and find splits on the GPU
+DEVICE = os.environ.get("XGB_DEVICE", "cpu")
+
+# Each script adds its objective and evaluation metric
+BASE_PARAMS = {
+    'max_depth': 6,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'device': DEVICE,
+}
+
+
+def feature_cols(path):
+    # Only the file schema is read; pandas index columns stored in the file are skipped too
+    schema = pq.read_schema(path)
+    index_columns = frozenset((schema.pandas_metadata or {}).get('index_columns', []))
+    return [col for col in schema.names if col not in EXCLUDE and col not in index_columns]
+
+
+def load_training_arrays(prefix, path, features, label, dtype):
+    # The decoded arrays only change with the data file or the feature list, so re-runs load
+    # them from the cache instead of decoding the Parquet file (only the newest entry is kept)
+    cache = cache_path(prefix, fingerprint([path], features))
+
+    if os.path.exists(cache):
+        print(f"Loading cached training arrays from {cache}")
+        cached = np.load(cache)
+        return cached['X'], cached['y']
+
+    # Only the feature and label columns are decoded, into one contiguous float32 feature
+    # matrix (XGBoost's own precision) and a contiguous label vector
+    df = pd.read_parquet(path, columns=features + [label], engine="pyarrow")
+    X = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+    y = np.ascontiguousarray(df[label].to_numpy(dtype=dtype))
+    del df
+
+    save_arrays(cache, X=X, y=y)
+    return X, y
+
+
+def chronological_split(X, y):
+    # Plain slices (views of X/y, not copies): the test set is the same last 20% that
+    # train_test_split(test_size=0.2, shuffle=False) gives, and the tail 10% of the rest is
+    # held out for early stopping
+    n_train = len(X) - int(np.ceil(0.2 * len(X)))
+    n_fit = n_train - int(np.ceil(0.1 * n_train))
+    return (X[:n_fit], y[:n_fit]), (X[n_fit:n_train], y[n_fit:n_train]), (X[n_train:], y[n_train:])
+
+
+def fit_booster(params, lr, dtrain, dval, num_boost_round, n_threads):
+    # Stops once the validation metric has not improved for 10 rounds; only the trees up to
+    # the best round are kept
+    booster = xgb.train({**params, 'learning_rate': lr, 'nthread': n_threads}, dtrain,
+                        num_boost_round=num_boost_round, evals=[(dval, 'val')],
+                        early_stopping_rounds=10, verbose_eval=False)
+    booster = booster[:booster.best_iteration + 1]
+    # Saved models (and the evaluation after each fit) predict on CPU wherever they are loaded
+    booster.set_param({'device': 'cpu'})
+    return booster
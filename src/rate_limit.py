@@ -0,0 +1,38 @@
+import threading
+import time
+from collections import deque
+
+"""
+Thread-Safe Sliding-Window Rate Limiter
+
+Shared by code that calls the Alpaca REST API from several threads at once, so that
+concurrent requests still respect the account's request budget (200 requests/minute).
+No more than `max_calls` requests are let through in any `period`-second window, including
+the first one after start-up.
+
+Usage:
+------
+    limiter = RateLimiter(max_calls=200, period=60)
+    limiter.acquire()   # blocks until a request slot is available
+    api.get_clock()
+"""
+
+
+class RateLimiter:
+    def __init__(self, max_calls, period):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = deque()  # monotonic times of the requests made in the last period
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                wait = self.period - (now - self.calls[0])
+            time.sleep(wait)
@@ -1,10 +1,8 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
-from ta.volatility import BollingerBands
-from ta.volume import OnBalanceVolumeIndicator
+from src.indicators import (rolling_mean_std, pct_change, price_change_count, vwap_log_return, rsi, macd, macd_signal,
+                            bollinger_bands, on_balance_volume)
 
 """
 Feature Engineering Script for Stock Price Data
@@ -29,40 +27,49 @@ This feature set is suitable for feeding into regression or classification model
 """
 
 def build_features(df):
-    # VWAP calculation
-    df['vwap'] = (df['close'] * df['volume']).cumsum() / df['volume'].cumsum()
+    close = df['close'].to_numpy(dtype=np.float64)
+
+    # New columns are collected here and joined to the frame in one concat at the end,
+    # rather than inserted one by one
+    new_cols = {}
+
+    # VWAP calculation (the log return comes out of the same sweep)
+    vwap, log_return = vwap_log_return(close, df['volume'].to_numpy())
+    new_cols['vwap'] = vwap
 
     # Returns
-    df['return_1m'] = df['close'].pct_change()
-    df['log_return'] = np.log(df['close'] / df['close'].shift(1))
+    new_cols['return_1m'] = pct_change(close, 1)
+    new_cols['log_return'] = log_return
 
-    # Rolling features
+    # Rolling features: same compiled kernel as the training data pipeline, one pass per window
     windows = [5, 10, 30, 60, 120, 390]
+    rolling = rolling_mean_std(close, windows)
     for w in windows:
-        df[f'close_mean_{w}'] = df['close'].rolling(window=w).mean()
-        df[f'close_std_{w}'] = df['close'].rolling(window=w).std()
-        df[f'return_{w}'] = df['close'].pct_change(periods=w)
+        new_cols[f'close_mean_{w}'], new_cols[f'close_std_{w}'] = rolling[w]
+        new_cols[f'return_{w}'] = pct_change(close, w)
 
-    # Lag features
+    # Lag features: row i of a sliding window over the NaN-padded closes holds the five
+    # closes before it, so every lag column is a view into one buffer instead of a shift copy
+    padded = np.concatenate([np.full(5, np.nan), close])
+    lags = np.lib.stride_tricks.sliding_window_view(padded, 5)[:len(close), ::-1]
     for lag in range(1, 6):
-        df[f'lag_close_{lag}'] = df['close'].shift(lag)
+        new_cols[f'lag_close_{lag}'] = lags[:, lag - 1]
 
     # Technical indicators
-    df['rsi'] = RSIIndicator(df['close']).rsi()
-    macd_obj = MACD(df['close'])
-    df['macd'] = macd_obj.macd()
-    df['macd_signal'] = macd_obj.macd_signal()
-    bb = BollingerBands(df['close'])
-    df['bb_high'] = bb.bollinger_hband()
-    df['bb_low'] = bb.bollinger_lband()
-    df['obv'] = OnBalanceVolumeIndicator(close=df['close'], volume=df['volume']).on_balance_volume()
+    new_cols['rsi'] = rsi(close)
+    new_cols['macd'] = macd(close)
+    new_cols['macd_signal'] = macd_signal(close)
+    new_cols['bb_high'], new_cols['bb_low'] = bollinger_bands(close)
+    new_cols['obv'] = on_balance_volume(close, df['volume'].to_numpy())
 
     # Time features
-    df['minute'] = df.index.minute
-    df['hour'] = df.index.hour
-    df['day_of_week'] = df.index.dayofweek
+    new_cols['minute'] = df.index.minute
+    new_cols['hour'] = df.index.hour
+    new_cols['day_of_week'] = df.index.dayofweek
 
     # Trade count proxy to match classifier training
-    df['trade_count'] = df['close'].diff().ne(0).astype(int).rolling(window=5).sum()
+    new_cols['trade_count'] = price_change_count(close, window=5)
 
-    return df
+    # Recomputed columns replace any stale copies already in the input
+    df = df.drop(columns=[col for col in new_cols if col in df.columns])
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators import (bollinger_bands, ema, macd, macd_signal, on_balance_volume,
+                            price_change_count, rolling_mean_std, rsi, vwap_log_return)
+
+
+def _close_with_gaps():
+    rng = np.random.default_rng(0)
+    close = 150 + np.cumsum(rng.normal(0, 0.05, 2000))
+    close[:3] = np.nan
+    close[100:110] = np.nan
+    close[rng.integers(0, len(close), 40)] = np.nan
+    return close
+
+
+@pytest.mark.parametrize("span", [2, 3, 9, 12, 26])
+def test_ema_matches_pandas_across_interior_nans(span):
+    close = _close_with_gaps()
+    expected = pd.Series(close).ewm(span=span, min_periods=span, adjust=False).mean().to_numpy()
+    np.testing.assert_array_equal(ema(close, span), expected)
+
+
+def test_macd_signal_matches_pandas_across_interior_nans():
+    close = pd.Series(_close_with_gaps())
+
+    def _ema(series, span):
+        return series.ewm(span=span, min_periods=span, adjust=False).mean()
+
+    line = _ema(close, 12) - _ema(close, 26)
+    np.testing.assert_array_equal(macd(close.to_numpy()), line.to_numpy())
+    np.testing.assert_array_equal(macd_signal(close.to_numpy()), _ema(line, 9).to_numpy())
+
+
+def _close_and_volume():
+    # Random walk with NaN gaps, flat stretches (constant rolling windows) and zero-volume rows
+    rng = np.random.default_rng(1)
+    close = np.round(150 + np.cumsum(rng.normal(0, 0.05, 2000)), 2)
+    close[500:900] = close[500]
+    close[1200:1230] = close[1200]
+    close[[0, 50, 51, 1500]] = np.nan
+    volume = rng.integers(0, 5000, len(close)).astype(np.float64)
+    volume[:5] = 0
+    volume[[300, 1600]] = np.nan
+    return close, volume
+
+
+def test_rsi_matches_pandas():
+    close = pd.Series(_close_and_volume()[0])
+    diff = close.diff()
+    up = diff.where(diff > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    expected = np.where(down == 0, 100, 100 - (100 / (1 + up / down)))
+    np.testing.assert_allclose(rsi(close.to_numpy()), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("window", [5, 20, 390])
+def test_rolling_mean_std_matches_pandas(window):
+    close, _ = _close_and_volume()
+    mean, std = rolling_mean_std(close, [window])[window]
+    rolling = pd.Series(close).rolling(window)
+    np.testing.assert_allclose(mean, rolling.mean().to_numpy(), rtol=1e-12)
+    # pandas leaves rounding residue (< 1e-6) on flat windows, where the kernel gives exactly 0
+    np.testing.assert_allclose(std, rolling.std().to_numpy(), rtol=1e-9, atol=1e-6)
+    assert (std[500 + window - 1:900] == 0).all()
+
+
+def test_bollinger_bands_match_pandas():
+    close, _ = _close_and_volume()
+    rolling = pd.Series(close).rolling(20)
+    mean, std = rolling.mean().to_numpy(), rolling.std(ddof=0).to_numpy()
+    high, low = bollinger_bands(close)
+    np.testing.assert_allclose(high, mean + 2 * std, rtol=1e-12, atol=2e-6)
+    np.testing.assert_allclose(low, mean - 2 * std, rtol=1e-12, atol=2e-6)
+    assert (high[519:900] == close[500]).all() and (low[519:900] == close[500]).all()
+
+
+def test_on_balance_volume_matches_pandas():
+    close, volume = _close_and_volume()
+    volume = np.nan_to_num(volume)
+    shifted = pd.Series(close).shift(1).to_numpy()
+    expected = np.where(close < shifted, -volume, volume).cumsum()
+    np.testing.assert_array_equal(on_balance_volume(close, volume), expected)
+
+
+def test_price_change_count_matches_pandas():
+    close, _ = _close_and_volume()
+    expected = pd.Series(close).diff().ne(0).astype(int).rolling(window=5).sum().to_numpy()
+    np.testing.assert_array_equal(price_change_count(close, 5), expected)
+
+
+def test_vwap_log_return_match_pandas():
+    close, volume = _close_and_volume()
+    c, v = pd.Series(close), pd.Series(volume)
+    vwap, log_return = vwap_log_return(close, volume)
+    np.testing.assert_array_equal(vwap, ((c * v).cumsum() / v.cumsum()).to_numpy())
+    np.testing.assert_array_equal(log_return, np.log(c / c.shift(1)).to_numpy())